@@ -1,5 +1,26 @@
-from .sorterlist import *
+import sys as _sys
+
+from .sorterlist import sorter_dict, run_sorter, available_sorters, installed_sorters, get_default_params, \
+    run_klusta, run_tridesclous, run_mountainsort4, run_ironclust, run_kilosort, run_kilosort2, \
+    run_spykingcircus, run_herdingspikes, run_waveclus
+from . import sorterlist as _sorterlist
 from .version import version as __version__
 from .basesorter import BaseSorter
 from .launcher import run_sorters, collect_sorting_outputs, iter_output_folders, iter_sorting_output
 
+__all__ = _sorterlist.__all__ + ['BaseSorter', 'run_sorters', 'collect_sorting_outputs', 'iter_output_folders',
+                                 'iter_sorting_output']
+
+
+def __getattr__(name):
+    # sorter classes (KilosortSorter, ...) and sorter lists are imported lazily
+    if name in _sorterlist._lazy_names:
+        return getattr(_sorterlist, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+if _sys.version_info < (3, 7):
+    # no module __getattr__ (PEP 562) before python 3.7: resolve the names now
+    for _name in _sorterlist._lazy_names:
+        globals()[_name] = getattr(_sorterlist, _name)
+    del _name
@@ -18,11 +18,13 @@ a way to adapt params with datasets.
 """
 
 import time
-import copy
 from pathlib import Path
-import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import repeat
+import multiprocessing
 import shutil
 import os
+import sys
 import spikeextractors as se
 
 
@@ -37,7 +39,7 @@ class BaseSorter:
         {'name': 'output_folder', 'type': 'folder', 'value':None, 'default':None,  'title': "Sorting output folder path", 'base_param':True},
         {'name': 'verbose', 'type': 'bool', 'value':True, 'default':True,  'title': "The verbosity of the underlying spike sorter.", 'base_param':True},
         {'name': 'grouping_property', 'type': 'str', 'value':None, 'default':None,  'title': "Will sort the recording by the given property ('group', etc.)", 'base_param':True},
-        {'name': 'parallel', 'type': 'bool', 'value':False, 'default':False,  'title': "If the recording is sorted by a property, then it will do this in parallel", 'base_param':True},
+        {'name': 'parallel', 'type': 'list', 'values': [False, 'thread', 'process'], 'value':False, 'default':False,  'title': "If the recording is sorted by a property, then it will do this in parallel ('thread' or 'process' pool, True is 'thread')", 'base_param':True},
         {'name': 'delete_output_folder', 'type': 'bool', 'value':False, 'default':False, 'title': "If True, delete the results of the sorter, otherwise, it won't.", 'base_param':True},
     ]
     installation_mesg = ""  # error message when not installed
@@ -53,6 +55,18 @@ class BaseSorter:
 
         self.verbose = verbose
         self.grouping_property = grouping_property
+        # parallel can be False, True (= 'thread'), 'thread' or 'process':
+        #   * 'process': true parallelism for sorters running in python, but each
+        #     worker has a startup cost (high on Windows where processes are spawned)
+        #     and the recording must be dumpable (otherwise threads are used)
+        #   * 'thread': low startup cost, but groups only overlap where the GIL is
+        #     released (external sorter processes, numpy, I/O)
+        if parallel is True:
+            parallel = 'thread'
+        elif not parallel:
+            parallel = False
+        if parallel not in (False, 'process', 'thread'):
+            raise ValueError("parallel must be a bool, 'process' or 'thread'")
         self.parallel = parallel
         self.params = self.default_params()
 
@@ -75,13 +89,15 @@ class BaseSorter:
 
         # make folders
         for output_folder in self.output_folders:
-            if not output_folder.is_dir():
-                os.makedirs(str(output_folder))
+            os.makedirs(str(output_folder), exist_ok=True)
         self.delete_folders = delete_output_folder
 
     @classmethod
-    def default_params(self):
-        return copy.deepcopy(self._default_params)
+    def default_params(cls):
+        # shallow copy: only the nested lists/dicts need to be copied to protect
+        # _default_params from in-place changes (a deepcopy is much slower)
+        return {k: v.copy() if isinstance(v, (list, dict)) else v
+                for k, v in cls._default_params.items()}
 
     def set_params(self, **params):
         bad_params = []
@@ -93,8 +109,14 @@ class BaseSorter:
         self.params.update(params)
 
     def run(self):
-        for i, recording in enumerate(self.recording_list):
-            self._setup_recording(recording, self.output_folders[i])
+        if not self.parallel:
+            for i, recording in enumerate(self.recording_list):
+                self._setup_recording(recording, self.output_folders[i])
+        else:
+            # setup is mostly I/O and numpy copies which release the GIL, so threads
+            # are enough to overlap the groups (and keep the state set on self)
+            with ThreadPoolExecutor(max_workers=len(self.recording_list)) as executor:
+                list(executor.map(self._setup_recording, self.recording_list, self.output_folders))
 
         t0 = time.perf_counter()
 
@@ -102,14 +124,24 @@ class BaseSorter:
             for i, recording in enumerate(self.recording_list):
                 self._run(recording, self.output_folders[i])
         else:
-            # run in threads
-            threads = []
-            for i, recording in enumerate(self.recording_list):
-                thread = threading.Thread(target=self._run, args=(recording, self.output_folders[i]))
-                threads.append(thread)
-                thread.start()
-            for thread in threads:
-                thread.join()
+            # run groups in a pool of processes (or threads)
+            if self.parallel == 'process' and self._can_run_in_processes():
+                pool_kwargs = {}
+                if sys.version_info >= (3, 7):
+                    # mp_context is not available in python 3.6 (spawn is the default on Windows)
+                    if "win" in sys.platform:
+                        pool_kwargs['mp_context'] = multiprocessing.get_context('spawn')
+                    else:
+                        pool_kwargs['mp_context'] = multiprocessing.get_context()
+                # the workers get a description of each recording (not its traces)
+                # and rebuild the sorter from its class and params
+                recording_dicts = [recording.dump_to_dict() for recording in self.recording_list]
+                with ProcessPoolExecutor(max_workers=len(self.recording_list), **pool_kwargs) as executor:
+                    list(executor.map(_run_group, repeat(type(self)), repeat(self.params), repeat(self.verbose),
+                                      recording_dicts, self.output_folders))
+            else:
+                with ThreadPoolExecutor(max_workers=len(self.recording_list)) as executor:
+                    list(executor.map(self._run, self.recording_list, self.output_folders))
 
         t1 = time.perf_counter()
 
@@ -118,6 +150,19 @@ class BaseSorter:
 
         return t1 - t0
 
+    def _can_run_in_processes(self):
+        # daemonic processes (for instance in run_sorters with engine='multiprocessing')
+        # are not allowed to have children
+        if multiprocessing.current_process().daemon:
+            return False
+        # the recordings are reloaded in the workers from dump_to_dict(): in memory
+        # extractors (NumpyRecordingExtractor, ...) can not, threads are used instead
+        if not all(recording.check_if_dumpable() for recording in self.recording_list):
+            if self.verbose:
+                print('{}: the recording is not dumpable, groups are run in threads'.format(self.sorter_name))
+            return False
+        return True
+
     @staticmethod
     def get_sorter_version():
         # need be iplemented in subclass
@@ -174,3 +219,11 @@ class BaseSorter:
        this is speculative an nee to be discussed
        """
        return {}
+
+
+def _run_group(sorter_class, params, verbose, recording_dict, output_folder):
+    # run one group in a worker process of BaseSorter.run()
+    recording = se.load_extractor_from_dict(recording_dict)
+    sorter = sorter_class(recording=recording, output_folder=output_folder, verbose=verbose, parallel='process')
+    sorter.set_params(**params)
+    sorter._run(recording, output_folder)
@@ -0,0 +1,181 @@
+"""
+Setup functions shared by the kilosort and kilosort2 sorters.
+"""
+from pathlib import Path
+from functools import lru_cache
+import shutil
+import os
+import sys
+import numpy as np
+
+import spikeextractors as se
+
+from ..utils.shellscript import ShellScript
+from ..sorter_tools import _have_matlab_engine, _run_matlab_script_in_engine
+
+
+def prepare_probe(recording, electrode_dimensions=None):
+    """
+    Return the x/y coordinates and the groups of the channels as MATLAB
+    arrays, ready to be substituted in the channelmap template.
+    """
+    nchan = recording.get_num_channels()
+    property_names = recording.get_shared_channel_property_names()
+
+    if electrode_dimensions is None:
+        electrode_dimensions = [0, 1]
+    if 'group' in property_names:
+        groups = np.asarray(recording.get_channel_groups())
+    else:
+        groups = np.ones(nchan, dtype='int64')
+    if 'location' in property_names:
+        positions = np.array(recording.get_channel_locations())
+    else:
+        print("'location' information is not found. Using linear configuration")
+        positions = np.column_stack((np.zeros(nchan, dtype='int64'), np.arange(nchan)))
+        electrode_dimensions = [0, 1]
+
+    return dict(
+        xcoords=_to_matlab_array_str(positions[:, electrode_dimensions[0]]),
+        ycoords=_to_matlab_array_str(positions[:, electrode_dimensions[1]]),
+        kcoords=_to_matlab_array_str(groups)
+    )
+
+
+def prepare_dat_file(recording, output_folder):
+    """
+    Return the int16 binary file to give to kilosort, writing a copy of the
+    recording in output_folder only when the source can not be used as is.
+    """
+    # the raw file can only be used if kilosort sees the same channels as the recording
+    if isinstance(recording, se.BinDatRecordingExtractor) and recording._time_axis == 0 and \
+            recording._timeseries.dtype == np.dtype('int16') and recording._complete_channels:
+        if recording._timeseries.offset == 0:
+            # no need to copy
+            return Path(recording._datfile).resolve()
+        else:
+            # already the right layout after a header: copy the bytes without casting
+            save_path = output_folder / 'recording.dat'
+            n_bytes = recording._timeseries.size * recording._timeseries.itemsize
+            with open(str(recording._datfile), 'rb') as src, save_path.open('wb') as dst:
+                src.seek(recording._timeseries.offset)
+                while n_bytes > 0:
+                    block = src.read(min(n_bytes, 2 ** 24))
+                    if not block:
+                        break
+                    dst.write(block)
+                    n_bytes -= len(block)
+            if n_bytes > 0:
+                save_path.unlink()
+                raise EOFError("{} is shorter than the number of frames and channels "
+                               "of the recording".format(recording._datfile))
+            return save_path
+    else:
+        # save binary file (chunk by chunk) into a new file
+        return write_binary_dat_format_int16(recording, output_folder / 'recording')
+
+
+def write_binary_dat_format_int16(recording, save_path, chunk_size=None):
+    """
+    Save the traces of a recording as an int16 binary file with time_axis=0,
+    as expected by kilosort.
+
+    The traces are read chunk by chunk (2 ** 24 values by default) and each
+    chunk is casted and transposed in a single assignment directly into a
+    memmap of the output file, so the memory used does not depend on the size
+    of the recording and the OS can flush pages to disk while the next chunk
+    is read.
+    """
+    save_path = Path(save_path)
+    if save_path.suffix == '':
+        save_path = save_path.parent / (save_path.name + '.dat')
+
+    n_chan = recording.get_num_channels()
+    n_sample = recording.get_num_frames()
+    if chunk_size is None:
+        chunk_size = 2 ** 24 // max(1, n_chan)
+    chunk_size = max(1, chunk_size)
+
+    if n_sample == 0 or n_chan == 0:
+        # np.memmap can not map an empty file
+        save_path.open('wb').close()
+        return save_path
+
+    data = np.memmap(str(save_path), dtype='int16', mode='w+', shape=(n_sample, n_chan))
+    for start in range(0, n_sample, chunk_size):
+        end = min(start + chunk_size, n_sample)
+        data[start:end, :] = recording.get_traces(start_frame=start, end_frame=end).T
+    data.flush()
+    del data
+    return save_path
+
+
+def write_templates(source_dir, output_folder, substitutions):
+    """
+    Fill the .m templates of source_dir and write them in output_folder.
+
+    substitutions is a dict {template file name: dict of substitutions}.
+    """
+    for fname, kwargs in substitutions.items():
+        txt = _read_template(source_dir / fname)
+        with (output_folder / fname).open('w') as f:
+            f.write(txt.format_map(kwargs))
+
+
+def copy_npy_utils(output_folder):
+    # the npy-matlab functions used by rezToPhy
+    utils_dir = Path(__file__).parent.parent / 'utils'
+    for fname in ['writeNPY.m', 'constructNPYheader.m']:
+        _copy_or_link(utils_dir / fname, Path(output_folder) / fname)
+
+
+def _copy_or_link(src, dst):
+    # hardlink when possible (same filesystem), otherwise copy
+    if dst.exists():
+        dst.unlink()
+    try:
+        os.link(str(src), str(dst))
+    except OSError:
+        shutil.copy(str(src), str(dst))
+
+
+def run_matlab_master(script_name, output_folder, use_engine=True):
+    """
+    Run the master script written in output_folder and return its exit code.
+
+    When use_engine is True and the MATLAB engine for python is installed, the
+    script runs in a persistent MATLAB session; otherwise (for instance for
+    groups sorted in parallel, which each need their own MATLAB process)
+    MATLAB is started in a subprocess.
+    """
+    if use_engine and _have_matlab_engine():
+        return _run_matlab_script_in_engine(script_name, output_folder)
+
+    if "win" in sys.platform:
+        shell_cmd = '''
+                    cd {tmpdir}
+                    matlab -nosplash -nodisplay -wait -r "try, {script_name}, catch, quit(1), end, quit(0)"
+                '''.format(tmpdir=output_folder, script_name=script_name)
+    else:
+        shell_cmd = '''
+                    #!/bin/bash
+                    cd {tmpdir}
+                    matlab -nosplash -nodisplay -r "try, {script_name}, catch, quit(1), end, quit(0)"
+                '''.format(tmpdir=output_folder, script_name=script_name)
+    shell_cmd = ShellScript(shell_cmd, keep_temp_files=True)
+    shell_cmd.start()
+
+    return shell_cmd.wait()
+
+
+@lru_cache(maxsize=None)
+def _read_template(template_path):
+    # templates are read once and reused for all groups and runs
+    with template_path.open('r') as f:
+        return f.read()
+
+
+def _to_matlab_array_str(values):
+    # format a 1d array in one line as a MATLAB array ('[0, 1, 2]')
+    return np.array2string(np.asarray(values), separator=', ', threshold=sys.maxsize,
+                           max_line_width=sys.maxsize, floatmode='unique')
@@ -1,14 +1,12 @@
 import copy
 from pathlib import Path
 import os
-import sys
 from typing import Union
-import shutil
-import numpy as np
 
 import spikeextractors as se
 from ..basesorter import BaseSorter
-from ..utils.shellscript import ShellScript
+from ._common import prepare_probe, prepare_dat_file, write_templates, copy_npy_utils, \
+    run_matlab_master
 
 from ..sorter_tools import _call_command_split
 
@@ -93,35 +91,15 @@ class KilosortSorter(BaseSorter):
             raise Exception(KilosortSorter.installation_mesg)
         assert isinstance(KilosortSorter.kilosort_path, str)
 
+        nchan = recording.get_num_channels()
+        sample_rate = recording.get_sampling_frequency()
+
         # prepare electrode positions
-        electrode_dimensions = p['electrode_dimensions']
-        if electrode_dimensions is None:
-            electrode_dimensions = [0, 1]
-        if 'group' in recording.get_shared_channel_property_names():
-            groups = recording.get_channel_groups()
-        else:
-            groups = [1] * recording.get_num_channels()
-        if 'location' in recording.get_shared_channel_property_names():
-            positions = np.array(recording.get_channel_locations())
-        else:
-            print("'location' information is not found. Using linear configuration")
-            positions = np.array(
-                [[0, i_ch] for i_ch in range(recording.get_num_channels())])
-            electrode_dimensions = [0, 1]
-
-        # save binary file
-        input_file_path = output_folder / 'recording'
-        recording.write_to_binary_dat_format(input_file_path, dtype='int16')
-
-        # set up kilosort config files and run kilosort on data
-        with (source_dir / 'kilosort_master.m').open('r') as f:
-            kilosort_master_txt = f.read()
-        with (source_dir / 'kilosort_config.m').open('r') as f:
-            kilosort_config_txt = f.read()
-        with (source_dir / 'kilosort_channelmap.m').open('r') as f:
-            kilosort_channelmap_txt = f.read()
+        coords = prepare_probe(recording, p['electrode_dimensions'])
+
+        # source file
+        dat_file = prepare_dat_file(recording, output_folder)
 
-        nchan = recording.get_num_channels()
         Nfilt = (nchan // 32) * 32 * 8
         if Nfilt == 0:
             Nfilt = nchan * 8
@@ -137,64 +115,40 @@ class KilosortSorter(BaseSorter):
         else:
             use_car = 0
 
-        # make substitutions in txt files
-        kilosort_master_txt = kilosort_master_txt.format(
-            kilosort_path=str(
-                Path(KilosortSorter.kilosort_path).absolute()),
-            output_folder=str(output_folder),
-            channel_path=str(
-                (output_folder / 'kilosort_channelmap.m').absolute()),
-            config_path=str((output_folder / 'kilosort_config.m').absolute()),
-            useGPU=useGPU,
-        )
-
-        kilosort_config_txt = kilosort_config_txt.format(
-            nchanTOT=recording.get_num_channels(),
-            nchan=recording.get_num_channels(),
-            sample_rate=recording.get_sampling_frequency(),
-            dat_file=str((output_folder / 'recording.dat').absolute()),
-            Nfilt=Nfilt,
-            Nt=Nt,
-            kilo_thresh=p['detect_threshold'],
-            use_car=use_car,
-            freq_min=p['freq_min'],
-            freq_max=p['freq_max']
-        )
-
-        kilosort_channelmap_txt = kilosort_channelmap_txt.format(
-            nchan=recording.get_num_channels(),
-            sample_rate=recording.get_sampling_frequency(),
-            xcoords=list(positions[:, electrode_dimensions[0]]),
-            ycoords=list(positions[:, electrode_dimensions[1]]),
-            kcoords=groups
-        )
-
-        for fname, value in zip(['kilosort_master.m', 'kilosort_config.m',
-                                 'kilosort_channelmap.m'],
-                                [kilosort_master_txt, kilosort_config_txt,
-                                 kilosort_channelmap_txt]):
-            with (output_folder / fname).open('w') as f:
-                f.writelines(value)
-
-        shutil.copy(str(source_dir.parent / 'utils' / 'writeNPY.m'), str(output_folder))
-        shutil.copy(str(source_dir.parent / 'utils' / 'constructNPYheader.m'), str(output_folder))
+        # set up kilosort config files with substitutions
+        write_templates(source_dir, output_folder, {
+            'kilosort_master.m': dict(
+                kilosort_path=str(
+                    Path(KilosortSorter.kilosort_path).absolute()),
+                output_folder=str(output_folder),
+                channel_path=str(
+                    (output_folder / 'kilosort_channelmap.m').absolute()),
+                config_path=str((output_folder / 'kilosort_config.m').absolute()),
+                useGPU=useGPU,
+            ),
+            'kilosort_config.m': dict(
+                nchanTOT=nchan,
+                nchan=nchan,
+                sample_rate=sample_rate,
+                dat_file=str(dat_file.absolute()),
+                Nfilt=Nfilt,
+                Nt=Nt,
+                kilo_thresh=p['detect_threshold'],
+                use_car=use_car,
+                freq_min=p['freq_min'],
+                freq_max=p['freq_max']
+            ),
+            'kilosort_channelmap.m': dict(
+                nchan=nchan,
+                sample_rate=sample_rate,
+                **coords
+            ),
+        })
+
+        copy_npy_utils(output_folder)
 
     def _run(self, recording, output_folder):
-        if "win" in sys.platform:
-            shell_cmd = '''
-                        cd {tmpdir}
-                        matlab -nosplash -nodisplay -wait -r kilosort_master
-                    '''.format(tmpdir=output_folder)
-        else:
-            shell_cmd = '''
-                        #!/bin/bash
-                        cd {tmpdir}
-                        matlab -nosplash -nodisplay -r kilosort_master
-                    '''.format(tmpdir=output_folder)
-        shell_cmd = ShellScript(shell_cmd, keep_temp_files=True)
-        shell_cmd.start()
-
-        retcode = shell_cmd.wait()
+        retcode = run_matlab_master('kilosort_master', output_folder, use_engine=not self.parallel)
 
         if retcode != 0:
             raise Exception('kilosort returned a non-zero exit code')
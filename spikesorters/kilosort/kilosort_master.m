@@ -23,12 +23,11 @@ try
 
     % save python results file for Phy
     rezToPhy(rez, fullfile(fpath));
-catch
+catch err
     fprintf('----------------------------------------');
     fprintf(lasterr());
-    quit(1);
+    rethrow(err);
 end
-quit(0);
 
 
 
@@ -1,14 +1,12 @@
 from pathlib import Path
 import os
-import sys
-import numpy as np
 from typing import Union
-import shutil
 import copy
 
 import spikeextractors as se
 from ..basesorter import BaseSorter
-from ..utils.shellscript import ShellScript
+from ..kilosort._common import prepare_probe, prepare_dat_file, write_templates, copy_npy_utils, \
+    run_matlab_master
 
 from ..sorter_tools import _call_command_split
 
@@ -103,97 +101,54 @@ class Kilosort2Sorter(BaseSorter):
             raise Exception(Kilosort2Sorter.installation_mesg)
         assert isinstance(Kilosort2Sorter.kilosort2_path, str)
 
+        nchan = recording.get_num_channels()
+        sample_rate = recording.get_sampling_frequency()
+
         # prepare electrode positions
-        electrode_dimensions = p['electrode_dimensions']
-        if electrode_dimensions is None:
-            electrode_dimensions = [0, 1]
-        if 'group' in recording.get_shared_channel_property_names():
-            groups = recording.get_channel_groups()
-        else:
-            groups = [1] * recording.get_num_channels()
-        if 'location' in recording.get_shared_channel_property_names():
-            positions = np.array(recording.get_channel_locations())
-        else:
-            print("'location' information is not found. Using linear configuration")
-            positions = np.array(
-                [[0, i_ch] for i_ch in range(recording.get_num_channels())])
-            electrode_dimensions = [0, 1]
+        coords = prepare_probe(recording, p['electrode_dimensions'])
 
-        # save binary file
-        input_file_path = output_folder / 'recording'
-        recording.write_to_binary_dat_format(input_file_path, dtype='int16')
+        # source file
+        dat_file = prepare_dat_file(recording, output_folder)
 
         if p['car']:
             use_car = 1
         else:
             use_car = 0
 
-        # read the template txt files
-        with (source_dir / 'kilosort2_master.m').open('r') as f:
-            kilosort2_master_txt = f.read()
-        with (source_dir / 'kilosort2_config.m').open('r') as f:
-            kilosort2_config_txt = f.read()
-        with (source_dir / 'kilosort2_channelmap.m').open('r') as f:
-            kilosort2_channelmap_txt = f.read()
-
-        # make substitutions in txt files
-        kilosort2_master_txt = kilosort2_master_txt.format(
-            kilosort2_path=str(
-                Path(Kilosort2Sorter.kilosort2_path).absolute()),
-            output_folder=str(output_folder),
-            channel_path=str(
-                (output_folder / 'kilosort2_channelmap.m').absolute()),
-            config_path=str((output_folder / 'kilosort2_config.m').absolute()),
-        )
-
-        kilosort2_config_txt = kilosort2_config_txt.format(
-            nchan=recording.get_num_channels(),
-            sample_rate=recording.get_sampling_frequency(),
-            dat_file=str((output_folder / 'recording.dat').absolute()),
-            projection_threshold=p['projection_threshold'],
-            preclust_threshold=p['preclust_threshold'],
-            minFR=p['minFR'],
-            freq_min=p['freq_min'],
-            sigmaMask=p['sigmaMask'],
-            kilo_thresh=p['detect_threshold'],
-            use_car=use_car,
-            nPCs=p['nPCs']
-        )
-
-        kilosort2_channelmap_txt = kilosort2_channelmap_txt.format(
-            nchan=recording.get_num_channels(),
-            sample_rate=recording.get_sampling_frequency(),
-            xcoords=list(positions[:, electrode_dimensions[0]]),
-            ycoords=list(positions[:, electrode_dimensions[1]]),
-            kcoords=groups
-        )
-
-        for fname, txt in zip(['kilosort2_master.m', 'kilosort2_config.m',
-                               'kilosort2_channelmap.m'],
-                              [kilosort2_master_txt, kilosort2_config_txt,
-                               kilosort2_channelmap_txt]):
-            with (output_folder / fname).open('w') as f:
-                f.write(txt)
-
-        shutil.copy(str(source_dir.parent / 'utils' / 'writeNPY.m'), str(output_folder))
-        shutil.copy(str(source_dir.parent / 'utils' / 'constructNPYheader.m'), str(output_folder))
+        # set up kilosort2 config files with substitutions
+        write_templates(source_dir, output_folder, {
+            'kilosort2_master.m': dict(
+                kilosort2_path=str(
+                    Path(Kilosort2Sorter.kilosort2_path).absolute()),
+                output_folder=str(output_folder),
+                channel_path=str(
+                    (output_folder / 'kilosort2_channelmap.m').absolute()),
+                config_path=str((output_folder / 'kilosort2_config.m').absolute()),
+            ),
+            'kilosort2_config.m': dict(
+                nchan=nchan,
+                sample_rate=sample_rate,
+                dat_file=str(dat_file.absolute()),
+                projection_threshold=p['projection_threshold'],
+                preclust_threshold=p['preclust_threshold'],
+                minFR=p['minFR'],
+                freq_min=p['freq_min'],
+                sigmaMask=p['sigmaMask'],
+                kilo_thresh=p['detect_threshold'],
+                use_car=use_car,
+                nPCs=p['nPCs']
+            ),
+            'kilosort2_channelmap.m': dict(
+                nchan=nchan,
+                sample_rate=sample_rate,
+                **coords
+            ),
+        })
+
+        copy_npy_utils(output_folder)
 
     def _run(self, recording, output_folder):
-        if "win" in sys.platform:
-            shell_cmd = '''
-                        cd {tmpdir}
-                        matlab -nosplash -nodisplay -wait -r kilosort2_master
-                    '''.format(tmpdir=output_folder)
-        else:
-            shell_cmd = '''
-                        #!/bin/bash
-                        cd {tmpdir}
-                        matlab -nosplash -nodisplay -r kilosort2_master
-                    '''.format(tmpdir=output_folder)
-        shell_cmd = ShellScript(shell_cmd, keep_temp_files=True)
-        shell_cmd.start()
-
-        retcode = shell_cmd.wait()
+        retcode = run_matlab_master('kilosort2_master', output_folder, use_engine=not self.parallel)
 
         if retcode != 0:
             raise Exception('kilosort2 returned a non-zero exit code')
@@ -41,9 +41,8 @@ try
 
     fprintf('Saving results to Phy  \n')
     rezToPhy(rez, fullfile(fpath));
-catch
+catch err
     fprintf('----------------------------------------');
     fprintf(lasterr());
-    quit(1);
+    rethrow(err);
 end
-quit(0);
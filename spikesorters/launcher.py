@@ -19,7 +19,7 @@ def _run_one(arg_list):
     try:
         SorterClass = sorter_dict[sorter_name]
         sorter = SorterClass(recording=recording, output_folder=output_folder, grouping_property=grouping_property,
-                             parallel=True, verbose=verbose, delete_output_folder=False)
+                             parallel='thread', verbose=verbose, delete_output_folder=False)
         sorter.set_params(**params)
 
         run_time = sorter.run()
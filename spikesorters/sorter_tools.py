@@ -2,8 +2,15 @@
 Some utils function to run command.
 """
 from subprocess import Popen, PIPE, CalledProcessError, call
+from functools import lru_cache
 import shlex
 import sys
+import threading
+import os
+
+_matlab_engine = None
+_matlab_engine_pid = None
+_matlab_engine_lock = threading.Lock()
 
 
 def _run_command_and_print_output(command):
@@ -50,3 +57,51 @@ def _call_command_split(command_list):
         call(command_list)
     except CalledProcessError as e:
         raise Exception(e.output)
+
+
+@lru_cache(maxsize=None)
+def _have_matlab_engine():
+    # imported on demand: importing matlab.engine is slow and only kilosort uses it
+    try:
+        import matlab.engine  # noqa: F401
+    except (ImportError, OSError):
+        # OSError: the engine package is there but the MATLAB install is broken
+        return False
+    return True
+
+
+def _run_matlab_script_in_engine(script_name, folder):
+    """
+    Run a matlab script from its folder in a persistent MATLAB engine session.
+
+    The session is started at the first call and reused for the next ones,
+    which avoids the MATLAB startup time for each run. The session has a
+    single working directory, so calls are serialized: this must only be
+    used when groups are sorted one after the other.
+    Return 0 if the script ran without error, 1 otherwise.
+    """
+    import matlab.engine
+
+    global _matlab_engine, _matlab_engine_pid
+    with _matlab_engine_lock:
+        # a forked child process never reuses the session of its parent
+        if _matlab_engine is None or _matlab_engine_pid != os.getpid():
+            _matlab_engine = matlab.engine.start_matlab('-nodisplay -nosplash')
+            _matlab_engine_pid = os.getpid()
+        try:
+            matlab_path = _matlab_engine.path(nargout=1)
+            try:
+                _matlab_engine.cd(str(folder), nargout=0)
+                _matlab_engine.clearvars(nargout=0)
+                _matlab_engine.eval(script_name, nargout=0)
+            finally:
+                # the scripts add their folders (and the sorter sources) to the
+                # path: restore it so that the session does not keep them
+                _matlab_engine.path(matlab_path, nargout=0)
+        except matlab.engine.MatlabExecutionError:
+            return 1
+        except matlab.engine.EngineError:
+            # the session is dead: a new one is started at the next call
+            _matlab_engine = None
+            return 1
+    return 0
@@ -1,28 +1,81 @@
-from .klusta import KlustaSorter
-from .tridesclous import TridesclousSorter
-from .mountainsort4 import Mountainsort4Sorter
-from .ironclust import IronClustSorter
-from .kilosort import KilosortSorter
-from .kilosort2 import Kilosort2Sorter
-from .spyking_circus import SpykingcircusSorter
-from .herdingspikes import HerdingspikesSorter
-from .waveclus import WaveClusSorter
-
-sorter_full_list = [
-    KlustaSorter,
-    TridesclousSorter,
-    Mountainsort4Sorter,
-    IronClustSorter,
-    KilosortSorter,
-    Kilosort2Sorter,
-    SpykingcircusSorter,
-    HerdingspikesSorter,
-    WaveClusSorter
-]
-
-sorter_dict = {s.sorter_name: s for s in sorter_full_list}
-
-installed_sorter_list = [s for s in sorter_full_list if s.installed]
+import importlib
+import sys
+from functools import lru_cache
+from collections.abc import Mapping
+
+# sorter_name: (module, class name)
+# the sorter modules are imported only when a sorter is used, because each of
+# them imports the sorter package and checks its installation
+_sorter_modules = {
+    'klusta': ('.klusta', 'KlustaSorter'),
+    'tridesclous': ('.tridesclous', 'TridesclousSorter'),
+    'mountainsort4': ('.mountainsort4', 'Mountainsort4Sorter'),
+    'ironclust': ('.ironclust', 'IronClustSorter'),
+    'kilosort': ('.kilosort', 'KilosortSorter'),
+    'kilosort2': ('.kilosort2', 'Kilosort2Sorter'),
+    'spykingcircus': ('.spyking_circus', 'SpykingcircusSorter'),
+    'herdingspikes': ('.herdingspikes', 'HerdingspikesSorter'),
+    'waveclus': ('.waveclus', 'WaveClusSorter'),
+}
+
+_sorter_class_names = {class_name: sorter_name for sorter_name, (_, class_name) in _sorter_modules.items()}
+
+# names resolved lazily by __getattr__
+_lazy_names = list(_sorter_class_names) + ['sorter_full_list', 'installed_sorter_list']
+
+__all__ = ['sorter_dict', 'run_sorter', 'available_sorters', 'installed_sorters', 'get_default_params'] + \
+          ['run_' + sorter_name for sorter_name in _sorter_modules] + _lazy_names
+
+
+@lru_cache(maxsize=None)
+def _import_sorter(sorter_name):
+    module_name, class_name = _sorter_modules[sorter_name]
+    module = importlib.import_module(module_name, package=__package__)
+    return getattr(module, class_name)
+
+
+class _SorterDict(Mapping):
+    """
+    Read-only dict {sorter_name: SorterClass} that imports the sorter on access.
+    """
+    def __getitem__(self, sorter_name):
+        return _import_sorter(sorter_name)
+
+    def __iter__(self):
+        return iter(_sorter_modules)
+
+    def __len__(self):
+        return len(_sorter_modules)
+
+
+sorter_dict = _SorterDict()
+
+
+def __getattr__(name):
+    # sorter classes, sorter_full_list and installed_sorter_list are resolved lazily
+    if name in _sorter_class_names:
+        return sorter_dict[_sorter_class_names[name]]
+    elif name == 'sorter_full_list':
+        return list(sorter_dict.values())
+    elif name == 'installed_sorter_list':
+        return [s for s in sorter_dict.values() if s.installed]
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+if sys.version_info < (3, 7):
+    # module __getattr__ (PEP 562) is only used from python 3.7: resolve the names now
+    for _name in _lazy_names:
+        globals()[_name] = __getattr__(_name)
+    del _name
+
+
+def _get_sorter_class(sorter_name_or_class):
+    if isinstance(sorter_name_or_class, str):
+        return sorter_dict[sorter_name_or_class]
+    sorter_name = getattr(sorter_name_or_class, 'sorter_name', None)
+    if sorter_name in sorter_dict and sorter_dict[sorter_name] is sorter_name_or_class:
+        return sorter_name_or_class
+    raise (ValueError('Unknown sorter'))
 
 
 # generic laucnher via function approach
@@ -40,12 +93,7 @@ def run_sorter(sorter_name_or_class, recording, output_folder=None, delete_outpu
        >>> sorting = run_sorter(TridesclousSorter, recording)
 
     """
-    if isinstance(sorter_name_or_class, str):
-        SorterClass = sorter_dict[sorter_name_or_class]
-    elif sorter_name_or_class in sorter_full_list:
-        SorterClass = sorter_name_or_class
-    else:
-        raise (ValueError('Unknown sorter'))
+    SorterClass = _get_sorter_class(sorter_name_or_class)
 
     sorter = SorterClass(recording=recording, output_folder=output_folder, grouping_property=grouping_property,
                          parallel=parallel, verbose=verbose, delete_output_folder=delete_output_folder)
@@ -67,7 +115,7 @@ def installed_sorters():
     '''
     Lists installed sorters.
     '''
-    return sorted(list([s.sorter_name for s in installed_sorter_list]))
+    return sorted([sorter_name for sorter_name, s in sorter_dict.items() if s.installed])
 
 
 def get_default_params(sorter_name_or_class):
@@ -85,12 +133,7 @@ def get_default_params(sorter_name_or_class):
         Dictionary with default params for the specified sorter
 
     '''
-    if isinstance(sorter_name_or_class, str):
-        SorterClass = sorter_dict[sorter_name_or_class]
-    elif sorter_name_or_class in sorter_full_list:
-        SorterClass = sorter_name_or_class
-    else:
-        raise (ValueError('Unknown sorter'))
+    SorterClass = _get_sorter_class(sorter_name_or_class)
 
     return SorterClass.default_params()
 
@@ -8,7 +8,7 @@ class SorterCommonTestSuite:
     This is the minimal test suite for each sorter class:
       * run once
       * run with several groups
-      * run with several groups in thread
+      * run with several groups in parallel (processes or threads)
     """
     SorterClass = None
 
@@ -41,7 +41,7 @@ class SorterCommonTestSuite:
 
         params = self.SorterClass.default_params()
 
-        for parallel in [False, True]:
+        for parallel in [False, True, 'process']:
             sorter = self.SorterClass(recording=recording, output_folder=None,
                                       grouping_property='group', parallel=parallel, verbose=False)
             sorter.set_params(**params)
@@ -0,0 +1,76 @@
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+import spikeextractors as se
+
+from spikesorters import sorter_full_list, BaseSorter
+
+
+class _PidSorter(BaseSorter):
+    # minimal sorter writing the pid of the process running each group
+    sorter_name = 'pid_sorter'
+    installed = True
+
+    def _setup_recording(self, recording, output_folder):
+        pass
+
+    def _run(self, recording, output_folder):
+        with open(str(output_folder / 'pid.txt'), mode='w') as f:
+            f.write(str(os.getpid()))
+
+
+def _make_grouped_recording(raw_filename=None):
+    traces = np.zeros((4, 100), dtype='float32')
+    if raw_filename is None:
+        recording = se.NumpyRecordingExtractor(timeseries=traces, sampling_frequency=30000.)
+    else:
+        traces.T.tofile(str(raw_filename))
+        recording = se.BinDatRecordingExtractor(raw_filename, 30000., 4, 'float32', time_axis=0)
+    for ch_id in range(4):
+        recording.set_channel_property(ch_id, 'group', ch_id // 2)
+    return recording
+
+
+def _run_pids(recording, parallel, output_folder):
+    sorter = _PidSorter(recording=recording, output_folder=output_folder,
+                        grouping_property='group', parallel=parallel)
+    sorter.run()
+    pids = []
+    for folder in sorter.output_folders:
+        with open(str(folder / 'pid.txt'), mode='r') as f:
+            pids.append(int(f.read()))
+    return pids
+
+
+def test_default_params():
+    for SorterClass in sorter_full_list:
+        params = SorterClass.default_params()
+        assert params == SorterClass._default_params
+
+        # modifying the returned params must not change the class defaults
+        for k, v in params.items():
+            if isinstance(v, (list, dict)):
+                assert v is not SorterClass._default_params[k]
+
+
+def test_parallel(tmp_path):
+    recording = _make_grouped_recording(tmp_path / 'raw.dat')
+    assert _run_pids(recording, False, tmp_path / 'no_parallel') == [os.getpid()] * 2
+    assert _run_pids(recording, 'thread', tmp_path / 'thread') == [os.getpid()] * 2
+    assert all(pid != os.getpid() for pid in _run_pids(recording, 'process', tmp_path / 'process'))
+
+    with pytest.raises(ValueError):
+        _PidSorter(recording=recording, output_folder=tmp_path / 'mpi', parallel='mpi')
+
+    # a recording that can not be dumped falls back to threads
+    recording = _make_grouped_recording()
+    assert _run_pids(recording, 'process', tmp_path / 'not_dumpable') == [os.getpid()] * 2
+
+
+if __name__ == '__main__':
+    test_default_params()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_parallel(Path(tmp_dir))
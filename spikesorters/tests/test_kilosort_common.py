@@ -0,0 +1,93 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pytest
+import spikeextractors as se
+
+from spikesorters.kilosort._common import write_binary_dat_format_int16, prepare_dat_file
+
+
+def _make_recording(dtype, num_channels=4, num_frames=1003, seed=0):
+    rng = np.random.RandomState(seed)
+    traces = (rng.randn(num_channels, num_frames) * 100).astype(dtype)
+    return se.NumpyRecordingExtractor(timeseries=traces, sampling_frequency=30000.)
+
+
+def test_write_binary_dat_format_int16(tmp_path):
+    folder = tmp_path
+
+    for dtype in ['int16', 'float32']:
+        recording = _make_recording(dtype)
+        nchan = recording.get_num_channels()
+        # chunk_size does not divide the number of frames
+        save_path = write_binary_dat_format_int16(recording, folder / ('recording_' + dtype), chunk_size=100)
+        assert save_path == folder / ('recording_' + dtype + '.dat')
+
+        data = np.fromfile(str(save_path), dtype='int16').reshape(-1, nchan)
+        assert np.array_equal(data, recording.get_traces().T.astype('int16'))
+
+    # float values are truncated toward zero
+    traces = np.array([[1.7, -1.7, 2.5], [-0.4, 0.9, -3.99]], dtype='float32')
+    recording = se.NumpyRecordingExtractor(timeseries=traces, sampling_frequency=30000.)
+    save_path = write_binary_dat_format_int16(recording, folder / 'recording_trunc', chunk_size=2)
+    data = np.fromfile(str(save_path), dtype='int16').reshape(-1, 2)
+    assert np.array_equal(data, [[1, 0], [-1, 0], [2, -3]])
+
+    # empty recording gives an empty file
+    recording = _make_recording('float32', num_frames=0)
+    save_path = write_binary_dat_format_int16(recording, folder / 'recording_empty')
+    assert save_path.is_file() and save_path.stat().st_size == 0
+
+
+def test_prepare_dat_file(tmp_path):
+    folder = tmp_path
+    traces = _make_recording('int16').get_traces()
+    nchan = traces.shape[0]
+
+    # int16 file without header: used in place
+    raw_filename = folder / 'raw_no_offset.dat'
+    traces.T.tofile(str(raw_filename))
+    recording = se.BinDatRecordingExtractor(raw_filename, 30000., nchan, 'int16', time_axis=0)
+    assert prepare_dat_file(recording, folder) == raw_filename.resolve()
+
+    # subset of the channels of the file: the traces are written
+    recording = se.BinDatRecordingExtractor(raw_filename, 30000., nchan, 'int16', time_axis=0,
+                                            recording_channels=[0, 1])
+    dat_file = prepare_dat_file(recording, folder)
+    assert dat_file == folder / 'recording.dat'
+    data = np.fromfile(str(dat_file), dtype='int16').reshape(-1, 2)
+    assert np.array_equal(data, traces[:2].T)
+
+    # int16 file with a header: the data bytes are copied
+    raw_filename = folder / 'raw_offset.dat'
+    with raw_filename.open('wb') as f:
+        f.write(b'\x00' * 64)
+        traces.T.tofile(f)
+    recording = se.BinDatRecordingExtractor(raw_filename, 30000., nchan, 'int16', time_axis=0, file_offset=64)
+    dat_file = prepare_dat_file(recording, folder)
+    assert dat_file == folder / 'recording.dat'
+    data = np.fromfile(str(dat_file), dtype='int16').reshape(-1, nchan)
+    assert np.array_equal(data, traces.T)
+
+    # subset of the channels of a file with a header: the traces are written, not the bytes
+    recording_sub = se.BinDatRecordingExtractor(raw_filename, 30000., nchan, 'int16', time_axis=0,
+                                                file_offset=64, recording_channels=[0, 1])
+    dat_file = prepare_dat_file(recording_sub, folder)
+    data = np.fromfile(str(dat_file), dtype='int16').reshape(-1, 2)
+    assert np.array_equal(data, traces[:2].T)
+    assert np.array_equal(data, recording_sub.get_traces().T)
+
+    # truncated source file
+    with raw_filename.open('r+b') as f:
+        f.truncate(64 + traces.nbytes - 2)
+    with pytest.raises(EOFError):
+        prepare_dat_file(recording, folder)
+    assert not (folder / 'recording.dat').exists()
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_write_binary_dat_format_int16(Path(tmp_dir))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        test_prepare_dat_file(Path(tmp_dir))
@@ -0,0 +1,26 @@
+import json
+import subprocess
+import sys
+
+import spikesorters
+from spikesorters import available_sorters, get_default_params
+
+
+def test_lazy_import():
+    # run in a fresh interpreter: the sorters may already be imported by other tests
+    # (before python 3.7, the sorters are imported with the package)
+    code = ("import sys, json, spikesorters; "
+            "print(json.dumps(sorted(m for m in sys.modules if m.startswith('spikesorters.'))))")
+    modules = json.loads(subprocess.check_output([sys.executable, '-c', code]).decode())
+    if sys.version_info >= (3, 7):
+        for sorter_module in ['klusta', 'tridesclous', 'mountainsort4', 'ironclust', 'kilosort', 'kilosort2',
+                              'spyking_circus', 'herdingspikes', 'waveclus']:
+            assert 'spikesorters.' + sorter_module not in modules
+
+    assert 'kilosort' in available_sorters()
+    assert spikesorters.KilosortSorter.sorter_name == 'kilosort'
+    assert get_default_params('kilosort') == spikesorters.KilosortSorter.default_params()
+
+
+if __name__ == '__main__':
+    test_lazy_import()